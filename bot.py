@@ -1,10 +1,20 @@
+import time
+# Taken before the telegram imports so the startup profile includes them
+STARTED_AT = time.perf_counter()
+
+import asyncio
 import logging
 import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes, ConversationHandler
+from telegram.helpers import escape_markdown
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters, ContextTypes, ConversationHandler
 
 # Import the new database module
 import database as db
+from dispatch import UserOrderedUpdateProcessor, run_blocking, PRIORITY_ADMIN, PRIORITY_TRANSACTION, PRIORITY_VIEW
+import pagination
+from pagination import PaginatedView
+from startup import StartupProfile
 
 # Enable logging
 logging.basicConfig(
@@ -12,9 +22,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+startup_profile = StartupProfile(STARTED_AT)
+startup_profile.mark('imports')
+
 # Admin ID
 ADMIN_ID = 5924971946 # Replace with your Admin ID
 
+# Number of per-user ordered update workers; 0 keeps the single sequential dispatcher
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "0"))
+# Max queued updates per priority class before new ones are shed (admin updates are never shed).
+# Only the worker scheduler queues updates, so these need UPDATE_WORKERS > 0.
+USER_ACTION_QUEUE_LIMIT = int(os.getenv("USER_ACTION_QUEUE_LIMIT", "300"))
+VIEW_QUEUE_LIMIT = int(os.getenv("VIEW_QUEUE_LIMIT", "100"))
+# Warm the caches alongside the first getUpdates instead of before polling starts
+FAST_START = os.getenv("FAST_START", "1") == "1"
+# Seconds between batched writes of changed usernames and first names
+USER_FLUSH_INTERVAL = int(os.getenv("USER_FLUSH_INTERVAL", "5"))
+
 # Conversation states remain the same
 (
     USER_INPUT, AWAITING_REDEEM_CODE, AWAITING_VERIFY_CODE, AWAITING_LINK_TITLE,
@@ -32,18 +56,62 @@ main_panel_markup = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to
 admin_panel_back_button = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data='admin_panel')]])
 user_panel_back_button = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data='user_panel')]])
 
+# Buttons that only display data; these are the first to be shed under load
+VIEW_CALLBACKS = {'user_panel', 'get_code', 'wallet', 'pending_withdraw', 'contact', 'how_to_use', 'leaderboard'}
+BUSY_TEXT = "⏳ The bot is busy right now, please try again in a moment."
+
+# Last render of views that look the same for every user, keyed by callback data
+view_cache = {}
+
+# Paginated list screens, fetched one page at a time
+pending_withdraw_view = PaginatedView(
+    'pending_withdraw',
+    lambda owner, after_id, before_id, limit: db.get_pending_withdrawals_page(owner, after_id, before_id, limit),
+    lambda req: (f"ID: {req['id']}, Amount: ₹{req['amount']:.2f}, UPI: {req['upi_id']}", None),
+    title="Your pending withdrawals:\n\n",
+    empty_text="You have no pending withdrawals.",
+    footer_buttons=user_panel_back_button.inline_keyboard,
+    per_user=True,
+)
+links_view = PaginatedView(
+    'manage_links',
+    lambda owner, after_id, before_id, limit: db.get_links_page(after_id, before_id, limit),
+    lambda link: (None, [
+        InlineKeyboardButton(f"🔗 {link['title']}", url=link['url']),
+        InlineKeyboardButton(f"❌ Delete", callback_data=f"delete_link_{link['id']}")
+    ]),
+    title="🔗 **Manage Links**\n\nBelow are the current links.",
+    empty_text="No links have been added yet.",
+    footer_buttons=[
+        [InlineKeyboardButton("➕ Add New Link", callback_data="add_link_start")],
+        [InlineKeyboardButton("⬅️ Back", callback_data='admin_panel')],
+    ],
+    parse_mode='Markdown',
+    admin_only=True,
+)
+banned_users_view = PaginatedView(
+    'banned_users',
+    lambda owner, after_id, before_id, limit: db.get_banned_users_page(after_id, before_id, limit),
+    lambda user: (f"ID: `{user['id']}`, Username: @{escape_markdown(user['username'] or 'N/A')}", None),
+    title="Banned Users:\n\n",
+    empty_text="Banned Users:\n\nThe banned user list is empty.",
+    footer_buttons=[[InlineKeyboardButton("⬅️ Back", callback_data='manage_users')]],
+    parse_mode='Markdown',
+    admin_only=True,
+)
+
 
 # --- Bot Start and Main Menu ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /start is issued."""
     user = update.effective_user
     
-    if db.is_user_banned(user.id):
+    if await run_blocking(db.is_user_banned, user.id):
         await update.message.reply_text("You are banned from using this bot.")
         return
 
     # Add or update user in the database
-    db.add_or_update_user(user.id, user.username, user.first_name)
+    await run_blocking(db.add_or_update_user, user.id, user.username, user.first_name)
 
     if user.id == ADMIN_ID:
         await admin_panel(update, context)
@@ -74,7 +142,7 @@ async def user_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
 async def get_code(query: Update):
     """Shows active links to the user from the database."""
-    links = db.get_links()
+    links = await run_blocking(db.get_links)
 
     if not links:
         await query.edit_message_text("No links available.", reply_markup=user_panel_back_button)
@@ -84,19 +152,21 @@ async def get_code(query: Update):
     buttons.append([InlineKeyboardButton("⬅️ Back", callback_data='user_panel')])
     
     reply_markup = InlineKeyboardMarkup(buttons)
-    await query.edit_message_text("Here are the available links. Please visit them to find a verification code:", reply_markup=reply_markup)
+    text = "Here are the available links. Please visit them to find a verification code:"
+    view_cache['get_code'] = (text, reply_markup)
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 async def handle_verify_code(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
     code = update.message.text.strip()
     
-    if db.has_user_verified_code(user_id, code):
+    if await run_blocking(db.has_user_verified_code, user_id, code):
         await update.message.reply_text("You have already used this verification code.", reply_markup=user_panel_back_button)
         return ConversationHandler.END
 
-    valid_codes = db.get_verification_codes()
+    valid_codes = await run_blocking(db.get_verification_codes)
     if code in valid_codes:
-        db.verify_user_code(user_id, code)
+        await run_blocking(db.verify_user_code, user_id, code)
         await update.message.reply_text("✅ Verification successful!", reply_markup=user_panel_back_button)
     else:
         await update.message.reply_text("❌ Invalid code. Please try again.", reply_markup=user_panel_back_button)
@@ -105,26 +175,26 @@ async def handle_verify_code(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def handle_redeem_code(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
 
-    if not db.has_user_verified_any_code(user.id):
+    if not await run_blocking(db.has_user_verified_any_code, user.id):
         await update.message.reply_text("You must verify at least one code to claim a reward.", reply_markup=user_panel_back_button)
         return ConversationHandler.END
 
     code = update.message.text.strip()
-    status, message = db.redeem_code(user.id, code)
+    status, message = await run_blocking(db.redeem_code, user.id, code)
 
     await update.message.reply_text(message, reply_markup=user_panel_back_button)
     return ConversationHandler.END
 
 async def show_wallet(query: Update):
     user_id = query.from_user.id
-    wallet = db.get_user_wallet(user_id)
+    wallet = await run_blocking(db.get_user_wallet, user_id)
     text = f"💰 Your Wallet:\n\nBalance: ₹{wallet['balance']:.2f}\nTotal Withdrawn: ₹{wallet['withdrawn']:.2f}"
     await query.edit_message_text(text, reply_markup=user_panel_back_button)
 
 async def start_withdraw_flow(query: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the withdrawal conversation."""
-    min_withdraw = float(db.get_setting('min_withdraw'))
-    wallet = db.get_user_wallet(query.from_user.id)
+    min_withdraw = float(await run_blocking(db.get_setting, 'min_withdraw'))
+    wallet = await run_blocking(db.get_user_wallet, query.from_user.id)
     
     text = (f"Your current balance is ₹{wallet['balance']:.2f}\n"
             f"The minimum withdrawal amount is ₹{min_withdraw}.\n\n"
@@ -142,8 +212,8 @@ async def handle_withdraw_amount(update: Update, context: ContextTypes.DEFAULT_T
         return ConversationHandler.END
 
     user_id = update.effective_user.id
-    min_withdraw = float(db.get_setting('min_withdraw'))
-    wallet = db.get_user_wallet(user_id)
+    min_withdraw = float(await run_blocking(db.get_setting, 'min_withdraw'))
+    wallet = await run_blocking(db.get_user_wallet, user_id)
 
     if amount < min_withdraw:
         await update.message.reply_text(f"Minimum withdrawal amount is ₹{min_withdraw}. Please try again.", reply_markup=user_panel_back_button)
@@ -169,29 +239,19 @@ async def handle_withdraw_confirmation(update: Update, context: ContextTypes.DEF
         return ConversationHandler.END
     
     # The function now returns the new request ID
-    withdraw_id = db.submit_withdraw_request(user_id, amount, upi_id)
+    withdraw_id = await run_blocking(db.submit_withdraw_request, user_id, amount, upi_id)
+    pending_withdraw_view.invalidate()
 
     await query.edit_message_text(f"✅ Withdrawal request of ₹{amount} submitted successfully! Your Withdraw ID is {withdraw_id}.", reply_markup=user_panel_back_button)
     context.user_data.clear()
     return ConversationHandler.END
 
 async def show_pending_withdraw(query: Update):
-    user_id = query.from_user.id
-    user_withdrawals = db.get_pending_withdrawals(user_id)
-
-    if not user_withdrawals:
-        await query.edit_message_text("You have no pending withdrawals.", reply_markup=user_panel_back_button)
-        return
-
-    text = "Your pending withdrawals:\n\n"
-    for req in user_withdrawals:
-        text += f"ID: {req['id']}, Amount: ₹{req['amount']:.2f}, UPI: {req['upi_id']}\n"
-    
-    await query.edit_message_text(text, reply_markup=user_panel_back_button)
+    await pending_withdraw_view.show(query)
 
 async def show_leaderboard(query):
     """Displays the top 10 users by balance from the database."""
-    leaderboard = db.get_leaderboard(10)
+    leaderboard = await run_blocking(db.get_leaderboard, 10)
     
     text = "🏆 Leaderboard (Top 10 Earners):\n\n"
     if not leaderboard:
@@ -201,6 +261,7 @@ async def show_leaderboard(query):
             name = user['username'] or user['first_name'] or 'Unknown'
             text += f"{i}. {name} - ₹{user['balance']:.2f}\n"
     
+    view_cache['leaderboard'] = (text, user_panel_back_button)
     await query.edit_message_text(text, reply_markup=user_panel_back_button)
 
 
@@ -211,28 +272,13 @@ async def manage_links(query: Update):
     if isinstance(query, Update):
         query = query.callback_query
 
-    links = db.get_links()
-    text = "🔗 **Manage Links**\n\nBelow are the current links."
-    buttons = []
-
-    if not links:
-        text = "No links have been added yet."
-    else:
-        for link in links:
-            buttons.append([
-                InlineKeyboardButton(f"🔗 {link['title']}", url=link['url']),
-                InlineKeyboardButton(f"❌ Delete", callback_data=f"delete_link_{link['id']}")
-            ])
-    
-    buttons.append([InlineKeyboardButton("➕ Add New Link", callback_data="add_link_start")])
-    buttons.append([InlineKeyboardButton("⬅️ Back", callback_data='admin_panel')])
-    
-    reply_markup = InlineKeyboardMarkup(buttons)
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await links_view.show(query)
 
 async def handle_delete_link(query: Update, link_id: int):
     """Handles the deletion of a link by its ID."""
-    db.delete_link(link_id)
+    await run_blocking(db.delete_link, link_id)
+    links_view.invalidate()
+    view_cache.pop('get_code', None)
     await query.answer("Link deleted successfully.")
     await manage_links(query) # Refresh the view
 
@@ -245,7 +291,9 @@ async def handle_add_link_url(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Invalid URL. Must start with `http://` or `https://`.")
         return ConversationHandler.END
 
-    db.add_link(title, url)
+    await run_blocking(db.add_link, title, url)
+    links_view.invalidate()
+    view_cache.pop('get_code', None)
     await update.message.reply_text("✅ Link added successfully!", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data='manage_links')]]))
     return ConversationHandler.END
 
@@ -253,7 +301,7 @@ async def handle_min_withdraw_amount(update: Update, context: ContextTypes.DEFAU
     """Sets the minimum withdrawal amount in the database."""
     try:
         amount = float(update.message.text)
-        db.set_setting('min_withdraw', str(amount))
+        await run_blocking(db.set_setting, 'min_withdraw', str(amount))
         await update.message.reply_text(f"Minimum withdrawal amount set to ₹{amount}.", reply_markup=admin_panel_back_button)
     except ValueError:
         await update.message.reply_text("Invalid amount.", reply_markup=admin_panel_back_button)
@@ -262,7 +310,8 @@ async def handle_min_withdraw_amount(update: Update, context: ContextTypes.DEFAU
 async def handle_ban_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
         user_id_to_ban = int(update.message.text.strip())
-        db.ban_user(user_id_to_ban)
+        await run_blocking(db.ban_user, user_id_to_ban)
+        banned_users_view.invalidate()
         await update.message.reply_text(f"User {user_id_to_ban} has been banned.", reply_markup=admin_panel_back_button)
     except ValueError:
         await update.message.reply_text("Invalid User ID.", reply_markup=admin_panel_back_button)
@@ -271,32 +320,35 @@ async def handle_ban_user(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def handle_unban_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
         user_id_to_unban = int(update.message.text.strip())
-        db.unban_user(user_id_to_unban)
+        await run_blocking(db.unban_user, user_id_to_unban)
+        banned_users_view.invalidate()
         await update.message.reply_text(f"User {user_id_to_unban} has been unbanned.", reply_markup=admin_panel_back_button)
     except ValueError:
         await update.message.reply_text("Invalid User ID.", reply_markup=admin_panel_back_button)
     return ConversationHandler.END
 
 async def view_banned_users(query: Update):
-    banned_users = db.get_banned_users()
-    text = "Banned Users:\n\n"
-    if not banned_users:
-        text += "The banned user list is empty."
-    else:
-        for user in banned_users:
-            text += f"ID: `{user['id']}`, Username: @{user.get('username', 'N/A')}\n"
-    
-    reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data='manage_users')]])
-    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    await banned_users_view.show(query)
+
+async def handle_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles the Previous/Next buttons of the paginated views."""
+    query = update.callback_query
+    view, direction, cursor = pagination.parse_callback(query.data)
+    if view.admin_only and query.from_user.id != ADMIN_ID:
+        await query.answer("Not allowed.", show_alert=True)
+        return
+    await query.answer()
+    await view.show(query, direction, cursor)
 
 async def complete_withdraw(query: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str, withdraw_id: str):
     """Marks a withdrawal as complete."""
-    request = db.get_withdrawal_by_id(int(withdraw_id))
+    request = await run_blocking(db.get_withdrawal_by_id, int(withdraw_id))
     if not request:
         await query.answer("Request not found.", show_alert=True)
         return
 
-    db.update_withdrawal_status(int(withdraw_id), 'completed', request['amount'], request['user_id'])
+    await run_blocking(db.update_withdrawal_status, int(withdraw_id), 'completed', request['amount'], request['user_id'])
+    pending_withdraw_view.invalidate()
     
     await query.edit_message_text(f"Withdrawal {withdraw_id} for user {user_id} marked as complete.", reply_markup=admin_panel_back_button)
     try:
@@ -306,12 +358,13 @@ async def complete_withdraw(query: Update, context: ContextTypes.DEFAULT_TYPE, u
 
 async def return_withdraw(query: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str, withdraw_id: str):
     """Returns a withdrawal amount to the user's balance."""
-    request = db.get_withdrawal_by_id(int(withdraw_id))
+    request = await run_blocking(db.get_withdrawal_by_id, int(withdraw_id))
     if not request:
         await query.answer("Request not found.", show_alert=True)
         return
 
-    db.update_withdrawal_status(int(withdraw_id), 'returned', request['amount'], request['user_id'])
+    await run_blocking(db.update_withdrawal_status, int(withdraw_id), 'returned', request['amount'], request['user_id'])
+    pending_withdraw_view.invalidate()
 
     await query.edit_message_text(f"Withdrawal {withdraw_id} for user {user_id} has been returned. Balance refunded.", reply_markup=admin_panel_back_button)
     try:
@@ -320,11 +373,124 @@ async def return_withdraw(query: Update, context: ContextTypes.DEFAULT_TYPE, use
         logger.error(f"Failed to notify user {user_id} about return: {e}")
 
 
+# --- Update Scheduling ---
+
+def classify_update(update: object) -> int:
+    """Assigns an update to a scheduling priority class."""
+    if not isinstance(update, Update):
+        return PRIORITY_TRANSACTION
+    if update.effective_user and update.effective_user.id == ADMIN_ID:
+        return PRIORITY_ADMIN
+    if update.callback_query:
+        # Game callbacks carry no data
+        data = update.callback_query.data or ''
+        if data in VIEW_CALLBACKS or data.startswith(f'{pagination.PAGE_CALLBACK_PREFIX}:'):
+            return PRIORITY_VIEW
+    if update.message and update.message.text and update.message.text.startswith('/start'):
+        return PRIORITY_VIEW
+    # Button presses and replies inside the redeem, verify and withdraw flows
+    return PRIORITY_TRANSACTION
+
+async def shed_update(update: object) -> None:
+    """Answers an update the scheduler dropped under load, from cache where possible."""
+    if not isinstance(update, Update):
+        return
+    query = update.callback_query
+    if query:
+        cached = view_cache.get(query.data)
+        if cached:
+            text, reply_markup = cached
+            await query.answer()
+            await query.edit_message_text(text, reply_markup=reply_markup)
+        else:
+            await query.answer(BUSY_TEXT)
+    elif update.message:
+        await update.message.reply_text(BUSY_TEXT)
+
+
+# --- Startup ---
+
+async def warm_caches() -> None:
+    """Loads the database caches off the event loop."""
+    try:
+        await asyncio.to_thread(db.warm_caches)
+    except Exception as e:
+        # The caches fill on first use instead
+        logger.error(f"Failed to warm caches: {e}")
+        return
+    startup_profile.mark('caches_warm')
+
+async def flush_user_updates_periodically() -> None:
+    """Writes queued profile changes from /start in batches."""
+    while True:
+        await asyncio.sleep(USER_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(db.flush_user_updates)
+        except Exception as e:
+            logger.error(f"Failed to flush user updates: {e}")
+
+async def post_init(application: Application) -> None:
+    """Runs once the application is initialized, right before polling starts."""
+    startup_profile.mark('application_initialized')
+    # The application isn't running yet, so Application.create_task wouldn't track these
+    background_tasks.append(asyncio.create_task(flush_user_updates_periodically()))
+    if FAST_START:
+        background_tasks.append(asyncio.create_task(warm_caches()))
+    else:
+        await warm_caches()
+
+async def post_shutdown(application: Application) -> None:
+    """Stops the background tasks and writes whatever profile changes are still queued."""
+    for task in background_tasks:
+        task.cancel()
+    # Wait for them to unwind so a flush they started can't race the final one
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    try:
+        db.flush_user_updates()
+    except Exception as e:
+        logger.error(f"Failed to flush user updates: {e}")
+
+async def record_first_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    global timing_updates_in_flight
+    timing_updates_in_flight += 1
+    startup_profile.mark('first_update_received')
+
+async def record_first_response(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Runs after the regular handlers, so the first call marks time-to-first-response."""
+    global timing_updates_in_flight
+    timing_updates_in_flight -= 1
+    if not startup_profile.has_mark('first_response'):
+        startup_profile.mark('first_response')
+        startup_profile.log_report()
+    # Removing a handler group while Application.process_update walks the groups
+    # breaks that walk, so the handlers are removed after this update is done.
+    asyncio.get_running_loop().call_soon(remove_timing_handlers, context.application)
+
+def remove_timing_handlers(application: Application) -> None:
+    """Drops the startup timing handlers once no update is between them."""
+    if timing_updates_in_flight or first_update_handler not in application.handlers.get(FIRST_UPDATE_GROUP, ()):
+        return
+    application.remove_handler(first_update_handler, group=FIRST_UPDATE_GROUP)
+    application.remove_handler(first_response_handler, group=FIRST_RESPONSE_GROUP)
+
+# Run before and after every other handler group until the first response is recorded
+FIRST_UPDATE_GROUP = -1
+FIRST_RESPONSE_GROUP = 1
+first_update_handler = TypeHandler(Update, record_first_update)
+first_response_handler = TypeHandler(Update, record_first_response)
+# Updates that passed first_update_handler but not yet first_response_handler
+timing_updates_in_flight = 0
+# Tasks started in post_init, cancelled in post_shutdown
+background_tasks = []
+
+
 # --- Main Bot Execution ---
 def main() -> None:
     """Start the bot."""
     # Initialize the database on first run
     db.init_db()
+    startup_profile.mark('database_ready')
     
     # Use your actual bot token here from environment variables for security
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "7560387775:AAGkU96BfK1bH7XEmLAaiNEkRncWMtqLkXo")
@@ -332,7 +498,21 @@ def main() -> None:
         logger.error("FATAL: TELEGRAM_BOT_TOKEN is not set.")
         return
 
-    application = Application.builder().token(bot_token).build()
+    builder = Application.builder().token(bot_token).post_init(post_init).post_shutdown(post_shutdown)
+    if UPDATE_WORKERS > 0:
+        builder = builder.concurrent_updates(UserOrderedUpdateProcessor(
+            UPDATE_WORKERS,
+            classify=classify_update,
+            queue_limits={PRIORITY_TRANSACTION: USER_ACTION_QUEUE_LIMIT, PRIORITY_VIEW: VIEW_QUEUE_LIMIT},
+            shed=shed_update,
+        ))
+    elif os.getenv("USER_ACTION_QUEUE_LIMIT") or os.getenv("VIEW_QUEUE_LIMIT"):
+        logger.warning(
+            "USER_ACTION_QUEUE_LIMIT and VIEW_QUEUE_LIMIT have no effect while UPDATE_WORKERS is 0; "
+            "set UPDATE_WORKERS to enable prioritised, load-shedding dispatch."
+        )
+    application = builder.build()
+    startup_profile.mark('application_built')
 
     # The ConversationHandler logic remains largely the same, as it deals with flow control.
     # The actual data operations within the handlers have been updated.
@@ -361,8 +541,13 @@ def main() -> None:
     )
 
     application.add_handler(CommandHandler("start", start))
+    # Registered ahead of the conversation, whose entry point catches every button
+    application.add_handler(CallbackQueryHandler(handle_page, pattern=f'^{pagination.PAGE_CALLBACK_PREFIX}:'))
     application.add_handler(conv_handler)
     application.add_handler(CallbackQueryHandler(button)) # Fallback for non-conversation buttons
+    # Handler groups run in order, so these bracket the handling of each update
+    application.add_handler(first_update_handler, group=FIRST_UPDATE_GROUP)
+    application.add_handler(first_response_handler, group=FIRST_RESPONSE_GROUP)
 
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
@@ -1,410 +1,275 @@
-import sqlite3
-from datetime import datetime
-
-DATABASE_FILE = "bot_data.db"
-
-def get_db_connection():
-    """Establishes a connection to the database."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row  # This allows accessing columns by name
-    return conn
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from storage import create_backend
+
+# Which storage engine to use: "sqlite" (default) or "memory"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+DATABASE_FILE = os.getenv("DATABASE_FILE", "bot_data.db")
+
+if STORAGE_BACKEND == "sqlite":
+    backend = create_backend(STORAGE_BACKEND, database_file=DATABASE_FILE)
+else:
+    backend = create_backend(STORAGE_BACKEND)
+
+# Seconds a cached leaderboard is served before it is read again
+LEADERBOARD_CACHE_TTL = 30
+# How many recently seen users' names are remembered to skip redundant writes on /start
+RECENT_USERS_CACHE_SIZE = 10000
+
+_MISSING = object()
+
+class _CachedQuery:
+    """Read-through cache for one backend query, optionally expiring after `ttl` seconds."""
+
+    def __init__(self, load, ttl=None):
+        self._load = load
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = _MISSING
+        self._loaded_at = 0
+        self._generation = 0
+
+    def get(self):
+        with self._lock:
+            if self._value is not _MISSING and (self.ttl is None or time.monotonic() - self._loaded_at < self.ttl):
+                return self._value
+            generation = self._generation
+        value = self._load()
+        with self._lock:
+            # Don't store a value that an invalidate() made stale while it was loading
+            if generation == self._generation:
+                self._value = value
+                self._loaded_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = _MISSING
+
+_settings_cache = _CachedQuery(lambda: backend.get_settings())
+_banned_ids_cache = _CachedQuery(lambda: backend.get_banned_user_ids())
+_links_cache = _CachedQuery(lambda: backend.get_links())
+_leaderboard_cache = _CachedQuery(lambda: backend.get_leaderboard(10), ttl=LEADERBOARD_CACHE_TTL)
+_caches = (_settings_cache, _banned_ids_cache, _links_cache, _leaderboard_cache)
+
+# user_id -> (username, first_name) as last written, least recently seen first
+_recent_users = OrderedDict()
+# user_id -> (username, first_name) renames waiting for flush_user_updates()
+_pending_user_updates = {}
+_users_lock = threading.Lock()
+# Held while a rename batch is written, and by direct writes, so an older batch can't land after a newer write
+_flush_lock = threading.Lock()
+
+def set_backend(new_backend):
+    """Swaps the storage engine, e.g. for an in-memory one in benchmarks."""
+    global backend
+    flush_user_updates()
+    backend = new_backend
+    for cache in _caches:
+        cache.invalidate()
+    with _users_lock:
+        _recent_users.clear()
+
+def warm_caches():
+    """Loads the settings, bans, links and leaderboard caches ahead of the first request."""
+    for cache in _caches:
+        cache.get()
 
 def init_db():
-    """Initializes the database and creates tables if they don't exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # --- User and Wallet Management ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY,
-        username TEXT,
-        first_name TEXT,
-        balance REAL DEFAULT 0,
-        withdrawn REAL DEFAULT 0,
-        joined_at TEXT NOT NULL
-    )''')
-
-    # --- Redeem Codes ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS redeem_codes (
-        code TEXT PRIMARY KEY,
-        reward REAL NOT NULL,
-        is_used INTEGER DEFAULT 0,
-        used_by INTEGER,
-        used_at TEXT,
-        FOREIGN KEY (used_by) REFERENCES users(id)
-    )''')
-    
-    # --- Verification Codes & Usage Tracking ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS verification_codes (
-        code TEXT PRIMARY KEY
-    )''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS user_verifications (
-        user_id INTEGER NOT NULL,
-        code TEXT NOT NULL,
-        verified_at TEXT NOT NULL,
-        PRIMARY KEY (user_id, code),
-        FOREIGN KEY (user_id) REFERENCES users(id),
-        FOREIGN KEY (code) REFERENCES verification_codes(code)
-    )''')
-
-    # --- Withdraw Requests ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS withdraw_requests (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        amount REAL NOT NULL,
-        upi_id TEXT NOT NULL,
-        status TEXT DEFAULT 'pending',
-        requested_at TEXT NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )''')
-
-    # --- Link Management ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS links (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        url TEXT NOT NULL UNIQUE
-    )''')
-    
-    # --- Banned Users ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS banned_users (
-        user_id INTEGER PRIMARY KEY,
-        banned_at TEXT NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )''')
-
-    # --- Admin Settings ---
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS admin_settings (
-        key TEXT PRIMARY KEY,
-        value TEXT
-    )''')
-    
-    # --- Default Settings ---
-    cursor.execute("INSERT OR IGNORE INTO admin_settings (key, value) VALUES (?, ?)", ('min_withdraw', '100'))
-    cursor.execute("INSERT OR IGNORE INTO admin_settings (key, value) VALUES (?, ?)", ('contact_info', 'Contact info not set.'))
-    cursor.execute("INSERT OR IGNORE INTO admin_settings (key, value) VALUES (?, ?)", ('tutorial_link', 'Tutorial link not set.'))
-
-    conn.commit()
-    conn.close()
+    """Creates the schema and default settings if they don't exist."""
+    return backend.init_db()
 
 # --- User Functions ---
 
 def add_or_update_user(user_id, username, first_name):
-    """Adds a new user or updates their name if they already exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR IGNORE INTO users (id, username, first_name, joined_at) VALUES (?, ?, ?, ?)",
-        (user_id, username, first_name, datetime.now().isoformat())
-    )
-    # Update names in case they change
-    cursor.execute(
-        "UPDATE users SET username = ?, first_name = ? WHERE id = ?",
-        (username, first_name, user_id)
-    )
-    conn.commit()
-    conn.close()
+    """Adds a new user or updates their name if they already exist.
+
+    Users seen recently with the same names cause no write at all. Renames of
+    users seen recently are queued for flush_user_updates(); anyone else is
+    written straight away so their row exists before the next query.
+    """
+    profile = (username, first_name)
+    with _users_lock:
+        known = _recent_users.get(user_id)
+        if known is not None:
+            _recent_users.move_to_end(user_id)
+            if known != profile:
+                _recent_users[user_id] = profile
+                _pending_user_updates[user_id] = profile
+            return
+
+    with _flush_lock:
+        with _users_lock:
+            # This write carries the newest names, so an older queued rename must not follow it
+            _pending_user_updates.pop(user_id, None)
+        backend.add_or_update_user(user_id, username, first_name)
+
+    with _users_lock:
+        _recent_users[user_id] = profile
+        if len(_recent_users) > RECENT_USERS_CACHE_SIZE:
+            _recent_users.popitem(last=False)
+
+def flush_user_updates():
+    """Writes the queued renames in a single batch. Returns how many were written."""
+    with _flush_lock:
+        with _users_lock:
+            if not _pending_user_updates:
+                return 0
+            batch = [(user_id, username, first_name) for user_id, (username, first_name) in _pending_user_updates.items()]
+            _pending_user_updates.clear()
+        try:
+            backend.upsert_users(batch)
+        except Exception:
+            # Put the batch back unless a newer rename was queued meanwhile
+            with _users_lock:
+                for user_id, username, first_name in batch:
+                    _pending_user_updates.setdefault(user_id, (username, first_name))
+            raise
+        return len(batch)
+
+def upsert_users(users):
+    """Adds or renames (user_id, username, first_name) users in one batch."""
+    return backend.upsert_users(users)
 
 def get_user_wallet(user_id):
-    """Retrieves a user's wallet details."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT balance, withdrawn FROM users WHERE id = ?", (user_id,))
-    user = cursor.fetchone()
-    conn.close()
-    if user:
-        return {'balance': user['balance'], 'withdrawn': user['withdrawn']}
-    return {'balance': 0, 'withdrawn': 0}
+    """Returns {'balance', 'withdrawn'} for the user, zeros if unknown."""
+    return backend.get_user_wallet(user_id)
 
 def update_user_balance(user_id, amount, is_withdrawal=False):
-    """Adds or subtracts from a user's balance."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if is_withdrawal:
-        cursor.execute("UPDATE users SET balance = balance - ?, withdrawn = withdrawn + ? WHERE id = ?", (amount, amount, user_id))
-    else:
-        cursor.execute("UPDATE users SET balance = balance + ? WHERE id = ?", (amount, user_id))
-    conn.commit()
-    conn.close()
+    """Adds to a user's balance, or moves `amount` from balance to withdrawn."""
+    return backend.update_user_balance(user_id, amount, is_withdrawal)
 
 def get_leaderboard(limit=10):
-    """Gets the top users by balance."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT first_name, username, balance FROM users ORDER BY balance DESC LIMIT ?", (limit,))
-    leaderboard = cursor.fetchall()
-    conn.close()
-    return leaderboard
-    
+    """Returns the top users by balance (first_name, username, balance)."""
+    if limit == 10:
+        return _leaderboard_cache.get()
+    return backend.get_leaderboard(limit)
+
 def get_all_users(page=0, per_page=50):
-    """Retrieves all users with pagination."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(id) FROM users")
-    total_users = cursor.fetchone()[0]
-    
-    offset = page * per_page
-    cursor.execute("SELECT id, first_name, username FROM users LIMIT ? OFFSET ?", (per_page, offset))
-    users = cursor.fetchall()
-    conn.close()
-    return users, total_users
+    """Returns (users, total_users) for one OFFSET page of users."""
+    return backend.get_all_users(page, per_page)
 
 # --- Redeem Code Functions ---
 
 def add_redeem_code(code, reward):
-    """Adds a new redeem code to the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO redeem_codes (code, reward) VALUES (?, ?)", (code, reward))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError: # Code already exists
-        return False
-    finally:
-        conn.close()
+    """Adds a redeem code. Returns False if the code already exists."""
+    return backend.add_redeem_code(code, reward)
 
 def redeem_code(user_id, code):
-    """Allows a user to redeem a code. Returns status and message."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT reward, is_used, used_by FROM redeem_codes WHERE code = ?", (code,))
-    redeem = cursor.fetchone()
-
-    if not redeem:
-        conn.close()
-        return "invalid", "Invalid or already claimed code."
-
-    if redeem['is_used']:
-        cursor.execute("SELECT first_name FROM users WHERE id = ?", (redeem['used_by'],))
-        claimer = cursor.fetchone()
-        claimer_name = f"User ID {redeem['used_by']}" if not claimer else claimer['first_name']
-        conn.close()
-        return "claimed", f"This code has already been claimed by {claimer_name}."
-
-    # Mark as used and update user balance
-    cursor.execute(
-        "UPDATE redeem_codes SET is_used = 1, used_by = ?, used_at = ? WHERE code = ?",
-        (user_id, datetime.now().isoformat(), code)
-    )
-    cursor.execute("UPDATE users SET balance = balance + ? WHERE id = ?", (redeem['reward'], user_id))
-    conn.commit()
-    conn.close()
-    return "success", f"🎉 Congratulations! You've redeemed ₹{redeem['reward']}."
+    """Redeems a code for a user. Returns (status, message)."""
+    return backend.redeem_code(user_id, code)
 
 # --- Withdraw Functions ---
 
 def submit_withdraw_request(user_id, amount, upi_id):
-    """Submits a new withdrawal request."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Decrement balance immediately upon request
-    cursor.execute("UPDATE users SET balance = balance - ? WHERE id = ?", (amount, user_id))
-    
-    cursor.execute(
-        "INSERT INTO withdraw_requests (user_id, amount, upi_id, requested_at) VALUES (?, ?, ?, ?)",
-        (user_id, amount, upi_id, datetime.now().isoformat())
-    )
-    request_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return request_id
+    """Deducts the amount and records a pending request. Returns its ID."""
+    return backend.submit_withdraw_request(user_id, amount, upi_id)
 
 def get_pending_withdrawals(user_id=None):
-    """Gets all pending withdrawals, optionally for a specific user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if user_id:
-        cursor.execute("SELECT id, amount, upi_id FROM withdraw_requests WHERE user_id = ? AND status = 'pending'", (user_id,))
-    else:
-        cursor.execute("SELECT id, user_id, amount, upi_id FROM withdraw_requests WHERE status = 'pending'")
-    requests = cursor.fetchall()
-    conn.close()
-    return requests
+    """Returns all pending withdrawals, optionally for a specific user."""
+    return backend.get_pending_withdrawals(user_id)
+
+def get_pending_withdrawals_page(user_id, after_id=None, before_id=None, limit=10):
+    """Returns one keyset page of a user's pending withdrawals, ordered by ID."""
+    return backend.get_pending_withdrawals_page(user_id, after_id, before_id, limit)
 
 def get_withdrawal_by_id(withdraw_id):
-    """Finds a single withdrawal request by its ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM withdraw_requests WHERE id = ? AND status = 'pending'", (withdraw_id,))
-    request = cursor.fetchone()
-    conn.close()
-    return request
+    """Returns a pending withdrawal request, or None."""
+    return backend.get_withdrawal_by_id(withdraw_id)
 
 def update_withdrawal_status(withdraw_id, new_status, amount=0, user_id=0):
-    """Updates a withdrawal's status to 'completed' or 'returned'."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if new_status == 'completed':
-        # On completion, update the user's total withdrawn amount
-        cursor.execute("UPDATE users SET withdrawn = withdrawn + ? WHERE id = ?", (amount, user_id))
-    elif new_status == 'returned':
-        # If returned, refund the balance to the user
-        cursor.execute("UPDATE users SET balance = balance + ? WHERE id = ?", (amount, user_id))
-
-    cursor.execute("UPDATE withdraw_requests SET status = ? WHERE id = ?", (new_status, withdraw_id))
-    conn.commit()
-    conn.close()
+    """Sets a withdrawal to 'completed' or 'returned' and adjusts the user's wallet."""
+    return backend.update_withdrawal_status(withdraw_id, new_status, amount, user_id)
 
 # --- Admin & Settings Functions ---
 
 def get_setting(key):
-    """Retrieves a setting value."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT value FROM admin_settings WHERE key = ?", (key,))
-    result = cursor.fetchone()
-    conn.close()
-    return result['value'] if result else None
+    """Returns a setting value, or None."""
+    return _settings_cache.get().get(key)
+
+def get_settings():
+    """Returns all settings as a dict."""
+    return backend.get_settings()
 
 def set_setting(key, value):
-    """Sets a setting value."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE admin_settings SET value = ? WHERE key = ?", (value, key))
-    conn.commit()
-    conn.close()
+    """Updates an existing setting."""
+    backend.set_setting(key, value)
+    _settings_cache.invalidate()
 
 # --- Link Management Functions ---
+
 def add_link(title, url):
-    """Adds a new link."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO links (title, url) VALUES (?, ?)", (title, url))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        # Handle case where URL is not unique
-        pass
-    finally:
-        conn.close()
+    """Adds a link, ignoring URLs that already exist."""
+    backend.add_link(title, url)
+    _links_cache.invalidate()
 
 def get_links():
-    """Retrieves all links."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, url FROM links")
-    links = cursor.fetchall()
-    conn.close()
-    return links
-    
+    """Returns all links (id, title, url)."""
+    return _links_cache.get()
+
+def get_links_page(after_id=None, before_id=None, limit=10):
+    """Returns one keyset page of links, ordered by ID."""
+    return backend.get_links_page(after_id, before_id, limit)
+
 def delete_link(link_id):
     """Deletes a link by its ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM links WHERE id = ?", (link_id,))
-    conn.commit()
-    conn.close()
+    backend.delete_link(link_id)
+    _links_cache.invalidate()
 
 # --- Verification Code Functions ---
 
 def add_verification_code(code):
-    """Adds a new verification code."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO verification_codes (code) VALUES (?)", (code,))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False # Already exists
-    finally:
-        conn.close()
-        
+    """Adds a verification code. Returns False if it already exists."""
+    return backend.add_verification_code(code)
+
 def get_verification_codes():
-    """Retrieves all verification codes."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT code FROM verification_codes")
-    codes = [row['code'] for row in cursor.fetchall()]
-    conn.close()
-    return codes
-    
+    """Returns a list of all verification codes."""
+    return backend.get_verification_codes()
+
 def delete_verification_code(code):
     """Deletes a verification code."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM verification_codes WHERE code = ?", (code,))
-    conn.commit()
-    conn.close()
+    return backend.delete_verification_code(code)
 
 def verify_user_code(user_id, code):
-    """Marks a code as used by a user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO user_verifications (user_id, code, verified_at) VALUES (?, ?, ?)",
-            (user_id, code, datetime.now().isoformat())
-        )
-        conn.commit()
-        return "success"
-    except sqlite3.IntegrityError:
-        return "already_used"
-    finally:
-        conn.close()
-        
+    """Records that a user used a code. Returns 'success' or 'already_used'."""
+    return backend.verify_user_code(user_id, code)
+
 def has_user_verified_code(user_id, code):
     """Checks if a user has already used a specific verification code."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM user_verifications WHERE user_id = ? AND code = ?", (user_id, code))
-    exists = cursor.fetchone()
-    conn.close()
-    return exists is not None
+    return backend.has_user_verified_code(user_id, code)
 
 def has_user_verified_any_code(user_id):
     """Checks if a user has verified at least one code."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM user_verifications WHERE user_id = ?", (user_id,))
-    exists = cursor.fetchone()
-    conn.close()
-    return exists is not None
+    return backend.has_user_verified_any_code(user_id)
 
 # --- Banned User Functions ---
+
 def ban_user(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO banned_users (user_id, banned_at) VALUES (?, ?)", (user_id, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    """Bans a user. Banning twice is a no-op."""
+    backend.ban_user(user_id)
+    _banned_ids_cache.invalidate()
 
 def unban_user(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM banned_users WHERE user_id = ?", (user_id,))
-    conn.commit()
-    conn.close()
-    
+    """Lifts a user's ban."""
+    backend.unban_user(user_id)
+    _banned_ids_cache.invalidate()
+
 def is_user_banned(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM banned_users WHERE user_id = ?", (user_id,))
-    is_banned = cursor.fetchone()
-    conn.close()
-    return is_banned is not None
+    """Checks if a user is banned."""
+    return user_id in _banned_ids_cache.get()
+
+def get_banned_user_ids():
+    """Returns the set of banned user IDs."""
+    return backend.get_banned_user_ids()
 
 def get_banned_users():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Join with users table to get their names
-    cursor.execute("""
-        SELECT u.id, u.username, u.first_name 
-        FROM banned_users b
-        JOIN users u ON b.user_id = u.id
-    """)
-    banned = cursor.fetchall()
-    conn.close()
-    return banned
\ No newline at end of file
+    """Returns banned users that are known users (id, username, first_name)."""
+    return backend.get_banned_users()
+
+def get_banned_users_page(after_id=None, before_id=None, limit=10):
+    """Returns one keyset page of banned users, ordered by user ID."""
+    return backend.get_banned_users_page(after_id, before_id, limit)
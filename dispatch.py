@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITY_ADMIN = 0
+PRIORITY_TRANSACTION = 1
+PRIORITY_VIEW = 2
+
+# The single-thread executor of the worker handling the current update
+_worker_executor = contextvars.ContextVar('worker_executor', default=None)
+
+
+async def run_blocking(func, *args):
+    """Runs a blocking call (database access, rendering) for the current update.
+
+    Inside a worker the call runs on that worker's own thread, so it keeps the
+    user's order without holding up the event loop. Without workers it is
+    called directly, as before.
+    """
+    executor = _worker_executor.get()
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+
+
+class WorkerStats:
+    """Queue depth and latency counters for a single worker."""
+
+    def __init__(self):
+        self.processed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency):
+        self.processed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def avg_latency(self):
+        return self.total_latency / self.processed if self.processed else 0.0
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Spreads updates over N workers, keyed by the sending user.
+
+    Every update from the same user is hashed onto the same worker, so a user's
+    updates are handled strictly in the order they arrived while different
+    users are served concurrently. Each worker owns a single-thread executor
+    that its handlers reach through ``run_blocking``, so their blocking work
+    runs off the event loop and in parallel with the other workers.
+
+    Within a worker, queued updates are served by priority class (see
+    ``classify``). When a class already has ``queue_limits[class]`` updates
+    waiting, new updates of that class are passed to ``shed`` instead of
+    being queued.
+    """
+
+    def __init__(self, workers, classify=None, queue_limits=None, shed=None,
+                 max_pending=512, admin_headroom=64, stats_interval=60):
+        queue_limits = queue_limits or {}
+        # The semaphore in the base class bounds updates that are queued *or*
+        # running. With queue limits it is sized so that every limited class
+        # can fill its queue while every worker is busy and admin updates still
+        # find `admin_headroom` free slots instead of waiting behind them.
+        if queue_limits:
+            concurrency = sum(queue_limits.values()) + workers + admin_headroom
+        else:
+            concurrency = max(max_pending, workers)
+        super().__init__(concurrency)
+        self.workers = workers
+        self.classify = classify or (lambda update: PRIORITY_TRANSACTION)
+        self.queue_limits = queue_limits
+        self.shed = shed
+        self.stats_interval = stats_interval
+        self._queues = []
+        self._executors = []
+        self._tasks = []
+        self._stats = []
+        self._stats_task = None
+        self._seq = 0
+        self._pending = {}
+        self._shed_counts = {}
+        self._shed_tasks = set()
+        # key -> [effective priority of the user's last queued update, queued count]
+        self._user_tails = {}
+
+    @staticmethod
+    def worker_key(update):
+        """Returns the value used to pick a worker for the update."""
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return 0
+
+    def worker_for(self, update):
+        return hash(self.worker_key(update)) % self.workers
+
+    async def do_process_update(self, update, coroutine):
+        priority = self.classify(update)
+        limit = self.queue_limits.get(priority)
+        if limit is not None and self._pending.get(priority, 0) >= limit:
+            self._shed_counts[priority] = self._shed_counts.get(priority, 0) + 1
+            # The handler never runs, close it so Python doesn't warn about it.
+            coroutine.close()
+            # Answer in the background so the shed update doesn't hold a semaphore slot
+            if self.shed:
+                task = asyncio.create_task(self._shed(update))
+                self._shed_tasks.add(task)
+                task.add_done_callback(self._shed_tasks.discard)
+            return
+
+        # A user's update may not overtake that user's earlier ones, so it is
+        # queued at no higher priority than the last update they still have queued.
+        key = self.worker_key(update)
+        tail = self._user_tails.get(key)
+        effective = max(priority, tail[0]) if tail else priority
+        self._user_tails[key] = [effective, tail[1] + 1 if tail else 1]
+        self._pending[priority] = self._pending.get(priority, 0) + 1
+
+        self._seq += 1
+        done = asyncio.get_running_loop().create_future()
+        # put_nowait keeps the enqueue synchronous, so the arrival order is preserved.
+        self._queues[self.worker_for(update)].put_nowait(
+            (effective, self._seq, time.monotonic(), priority, key, coroutine, done)
+        )
+        await done
+
+    async def _shed(self, update):
+        try:
+            await self.shed(update)
+        except Exception as e:
+            logger.error(f"Failed to answer a shed update: {e}")
+
+    async def _worker(self, index):
+        queue = self._queues[index]
+        stats = self._stats[index]
+        # Each worker task runs in its own context, so handlers awaited here see this executor
+        _worker_executor.set(self._executors[index])
+        while True:
+            _, _, enqueued_at, priority, key, coroutine, done = await queue.get()
+            self._pending[priority] -= 1
+            tail = self._user_tails[key]
+            tail[1] -= 1
+            if not tail[1]:
+                del self._user_tails[key]
+            try:
+                await coroutine
+            except Exception as e:
+                # Application.process_update already routes handler errors to the error handlers.
+                logger.error(f"Worker {index} failed to process an update: {e}")
+            finally:
+                stats.record(time.monotonic() - enqueued_at)
+                queue.task_done()
+                if not done.done():
+                    done.set_result(None)
+
+    async def _report_stats(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.log_stats()
+
+    def stats(self):
+        """Returns per-worker queue depth and latency figures."""
+        return [
+            {
+                'worker': i,
+                'queue_depth': self._queues[i].qsize(),
+                'processed': s.processed,
+                'avg_latency_ms': s.avg_latency * 1000,
+                'max_latency_ms': s.max_latency * 1000,
+            }
+            for i, s in enumerate(self._stats)
+        ]
+
+    def log_stats(self):
+        for s in self.stats():
+            logger.info(
+                f"Worker {s['worker']}: depth={s['queue_depth']} processed={s['processed']} "
+                f"avg={s['avg_latency_ms']:.1f}ms max={s['max_latency_ms']:.1f}ms"
+            )
+        if self._shed_counts:
+            logger.info(f"Shed updates by priority class: {self._shed_counts}")
+
+    async def initialize(self):
+        self._queues = [asyncio.PriorityQueue() for _ in range(self.workers)]
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'update-worker-{i}')
+            for i in range(self.workers)
+        ]
+        self._stats = [WorkerStats() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if self.stats_interval:
+            self._stats_task = asyncio.create_task(self._report_stats())
+
+    async def shutdown(self):
+        # Let queued updates finish before the workers are torn down.
+        for queue in self._queues:
+            await queue.join()
+        if self._shed_tasks:
+            await asyncio.gather(*self._shed_tasks, return_exceptions=True)
+        tasks = self._tasks + ([self._stats_task] if self._stats_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._stats_task = None
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        self._executors = []
+        self.log_stats()
@@ -0,0 +1,110 @@
+import time
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from dispatch import run_blocking
+
+# Callback data of navigation buttons: "page:<view>:<next|prev>:<cursor>"
+PAGE_CALLBACK_PREFIX = 'page'
+
+# All views by name, so a navigation button can be routed back to its view
+views = {}
+
+
+class PaginatedView:
+    """A list screen that is fetched and rendered one keyset page at a time.
+
+    `fetch_page(owner, after_id, before_id, limit)` must return rows ordered by
+    their `key` column. `render_row(row)` returns a text line and/or a row of
+    buttons for a single row, either of which may be None. Renders are cached
+    for `cache_ttl` seconds.
+    """
+
+    def __init__(self, name, fetch_page, render_row, title, empty_text, footer_buttons=(),
+                 key='id', page_size=10, cache_ttl=5, parse_mode=None,
+                 per_user=False, admin_only=False, max_cache_entries=1000):
+        self.name = name
+        self.fetch_page = fetch_page
+        self.render_row = render_row
+        self.title = title
+        self.empty_text = empty_text
+        self.footer_buttons = list(footer_buttons)
+        self.key = key
+        self.page_size = page_size
+        self.cache_ttl = cache_ttl
+        self.parse_mode = parse_mode
+        self.per_user = per_user
+        self.admin_only = admin_only
+        self.max_cache_entries = max_cache_entries
+        self._cache = {}
+        views[name] = self
+
+    def invalidate(self):
+        """Drops cached renders, e.g. after rows were added or deleted."""
+        self._cache.clear()
+
+    def render(self, owner=None, direction=None, cursor=None):
+        """Returns (text, reply_markup) for the page next to or before `cursor`."""
+        cache_key = (owner, direction, cursor)
+        cached = self._cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        after_id = cursor if direction == 'next' else None
+        before_id = cursor if direction == 'prev' else None
+        # One extra row tells us whether there is another page in that direction
+        rows = self.fetch_page(owner, after_id, before_id, self.page_size + 1)
+        if not rows and cursor is not None:
+            # The rows around the cursor are gone, start over from the first page
+            return self.render(owner)
+
+        if before_id is None:
+            has_prev = after_id is not None
+            has_next = len(rows) > self.page_size
+            rows = rows[:self.page_size]
+        else:
+            has_prev = len(rows) > self.page_size
+            has_next = True
+            rows = rows[-self.page_size:]
+
+        text = self.title
+        buttons = []
+        if not rows:
+            text = self.empty_text
+        for row in rows:
+            line, row_buttons = self.render_row(row)
+            if line:
+                text += line + "\n"
+            if row_buttons:
+                buttons.append(row_buttons)
+
+        nav = []
+        if has_prev:
+            nav.append(InlineKeyboardButton("◀️ Previous", callback_data=self._callback_data('prev', rows[0][self.key])))
+        if has_next:
+            nav.append(InlineKeyboardButton("Next ▶️", callback_data=self._callback_data('next', rows[-1][self.key])))
+        if nav:
+            buttons.append(nav)
+        buttons.extend(self.footer_buttons)
+
+        rendered = (text, InlineKeyboardMarkup(buttons))
+        if len(self._cache) >= self.max_cache_entries:
+            self._cache.clear()
+        self._cache[cache_key] = (time.monotonic(), rendered)
+        return rendered
+
+    async def show(self, query, direction=None, cursor=None):
+        """Edits the callback query's message to show the requested page."""
+        owner = query.from_user.id if self.per_user else None
+        # Fetching and rendering a page blocks, keep it off the event loop
+        text, reply_markup = await run_blocking(self.render, owner, direction, cursor)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=self.parse_mode)
+
+    def _callback_data(self, direction, cursor):
+        return f"{PAGE_CALLBACK_PREFIX}:{self.name}:{direction}:{cursor}"
+
+
+def parse_callback(data):
+    """Splits navigation callback data into (view, direction, cursor)."""
+    _, name, direction, cursor = data.split(':', 3)
+    return views[name], direction, int(cursor)
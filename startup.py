@@ -0,0 +1,32 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Records when each startup phase finished, relative to process start."""
+
+    def __init__(self, started_at=None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.marks = []
+
+    def mark(self, phase):
+        """Records that `phase` has just finished. Only the first mark of a phase counts."""
+        if not self.has_mark(phase):
+            self.marks.append((phase, time.perf_counter() - self.started_at))
+
+    def has_mark(self, phase):
+        return any(name == phase for name, _ in self.marks)
+
+    def elapsed(self, phase):
+        """Returns seconds from process start to `phase`, or None if it hasn't happened."""
+        return next((at for name, at in self.marks if name == phase), None)
+
+    def log_report(self):
+        previous = 0.0
+        lines = []
+        for phase, at in sorted(self.marks, key=lambda mark: mark[1]):
+            lines.append(f"  {phase:<24} +{(at - previous) * 1000:8.1f}ms  ({at * 1000:.1f}ms)")
+            previous = at
+        logger.info("Startup profile:\n" + "\n".join(lines))
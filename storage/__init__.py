@@ -0,0 +1,18 @@
+"""Storage backends for the bot's data."""
+from .base import StorageBackend
+from .memory import MemoryBackend
+from .sqlite import SQLiteBackend
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'memory': MemoryBackend,
+}
+
+
+def create_backend(name, **options):
+    """Builds the storage backend registered under `name`."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend {name!r}, expected one of {sorted(BACKENDS)}") from None
+    return backend_class(**options)
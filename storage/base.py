@@ -0,0 +1,155 @@
+from abc import ABC, abstractmethod
+
+
+class StorageBackend(ABC):
+    """Interface every storage engine implements.
+
+    Rows are returned as mappings that can be indexed by column name, e.g.
+    ``row['balance']``.
+    """
+
+    @abstractmethod
+    def init_db(self):
+        """Creates the schema and default settings if they don't exist."""
+
+    # --- User Functions ---
+
+    @abstractmethod
+    def add_or_update_user(self, user_id, username, first_name):
+        """Adds a new user or updates their name if they already exist."""
+
+    @abstractmethod
+    def upsert_users(self, users):
+        """Adds or renames (user_id, username, first_name) users in one batch."""
+
+    @abstractmethod
+    def get_user_wallet(self, user_id):
+        """Returns {'balance', 'withdrawn'} for the user, zeros if unknown."""
+
+    @abstractmethod
+    def update_user_balance(self, user_id, amount, is_withdrawal=False):
+        """Adds to a user's balance, or moves `amount` from balance to withdrawn."""
+
+    @abstractmethod
+    def get_leaderboard(self, limit=10):
+        """Returns the top users by balance (first_name, username, balance)."""
+
+    @abstractmethod
+    def get_all_users(self, page=0, per_page=50):
+        """Returns (users, total_users) for one OFFSET page of users."""
+
+    # --- Redeem Code Functions ---
+
+    @abstractmethod
+    def add_redeem_code(self, code, reward):
+        """Adds a redeem code. Returns False if the code already exists."""
+
+    @abstractmethod
+    def redeem_code(self, user_id, code):
+        """Redeems a code for a user. Returns (status, message)."""
+
+    # --- Withdraw Functions ---
+
+    @abstractmethod
+    def submit_withdraw_request(self, user_id, amount, upi_id):
+        """Deducts the amount and records a pending request. Returns its ID."""
+
+    @abstractmethod
+    def get_pending_withdrawals(self, user_id=None):
+        """Returns all pending withdrawals, optionally for a specific user."""
+
+    @abstractmethod
+    def get_pending_withdrawals_page(self, user_id, after_id=None, before_id=None, limit=10):
+        """Returns one keyset page of a user's pending withdrawals, ordered by ID."""
+
+    @abstractmethod
+    def get_withdrawal_by_id(self, withdraw_id):
+        """Returns a pending withdrawal request, or None."""
+
+    @abstractmethod
+    def update_withdrawal_status(self, withdraw_id, new_status, amount=0, user_id=0):
+        """Sets a withdrawal to 'completed' or 'returned' and adjusts the user's wallet."""
+
+    # --- Admin & Settings Functions ---
+
+    @abstractmethod
+    def get_setting(self, key):
+        """Returns a setting value, or None."""
+
+    @abstractmethod
+    def get_settings(self):
+        """Returns all settings as a dict."""
+
+    @abstractmethod
+    def set_setting(self, key, value):
+        """Updates an existing setting."""
+
+    # --- Link Management Functions ---
+
+    @abstractmethod
+    def add_link(self, title, url):
+        """Adds a link, ignoring URLs that already exist."""
+
+    @abstractmethod
+    def get_links(self):
+        """Returns all links (id, title, url)."""
+
+    @abstractmethod
+    def get_links_page(self, after_id=None, before_id=None, limit=10):
+        """Returns one keyset page of links, ordered by ID."""
+
+    @abstractmethod
+    def delete_link(self, link_id):
+        """Deletes a link by its ID."""
+
+    # --- Verification Code Functions ---
+
+    @abstractmethod
+    def add_verification_code(self, code):
+        """Adds a verification code. Returns False if it already exists."""
+
+    @abstractmethod
+    def get_verification_codes(self):
+        """Returns a list of all verification codes."""
+
+    @abstractmethod
+    def delete_verification_code(self, code):
+        """Deletes a verification code."""
+
+    @abstractmethod
+    def verify_user_code(self, user_id, code):
+        """Records that a user used a code. Returns 'success' or 'already_used'."""
+
+    @abstractmethod
+    def has_user_verified_code(self, user_id, code):
+        """Checks if a user has already used a specific verification code."""
+
+    @abstractmethod
+    def has_user_verified_any_code(self, user_id):
+        """Checks if a user has verified at least one code."""
+
+    # --- Banned User Functions ---
+
+    @abstractmethod
+    def ban_user(self, user_id):
+        """Bans a user. Banning twice is a no-op."""
+
+    @abstractmethod
+    def unban_user(self, user_id):
+        """Lifts a user's ban."""
+
+    @abstractmethod
+    def is_user_banned(self, user_id):
+        """Checks if a user is banned."""
+
+    @abstractmethod
+    def get_banned_user_ids(self):
+        """Returns the set of banned user IDs."""
+
+    @abstractmethod
+    def get_banned_users(self):
+        """Returns banned users that are known users (id, username, first_name)."""
+
+    @abstractmethod
+    def get_banned_users_page(self, after_id=None, before_id=None, limit=10):
+        """Returns one keyset page of banned users, ordered by user ID."""
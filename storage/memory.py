@@ -0,0 +1,283 @@
+import threading
+from datetime import datetime
+
+from .base import StorageBackend
+
+DEFAULT_SETTINGS = {
+    'min_withdraw': '100',
+    'contact_info': 'Contact info not set.',
+    'tutorial_link': 'Tutorial link not set.',
+}
+
+
+def _keyset_page(rows, key, after_id=None, before_id=None, limit=10):
+    """Mirrors the SQLite keyset queries over rows already sorted by `key`."""
+    if after_id is not None:
+        rows = [row for row in rows if row[key] > after_id]
+    if before_id is not None:
+        return [row for row in rows if row[key] < before_id][-limit:]
+    return rows[:limit]
+
+
+class MemoryBackend(StorageBackend):
+    """Keeps everything in process memory, with the same semantics as SQLiteBackend.
+
+    Nothing is persisted, which makes it useful for benchmarks and tests. All
+    methods hold one lock, so it is safe to share between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+        self._redeem_codes = {}
+        self._verification_codes = {}  # Used as an ordered set
+        self._verifications = {}  # user_id -> set of codes
+        self._withdrawals = {}
+        self._next_withdraw_id = 1
+        self._links = {}
+        self._next_link_id = 1
+        self._banned = {}  # user_id -> banned_at
+        self._settings = {}
+
+    def init_db(self):
+        with self._lock:
+            for key, value in DEFAULT_SETTINGS.items():
+                self._settings.setdefault(key, value)
+
+    # --- User Functions ---
+
+    def add_or_update_user(self, user_id, username, first_name):
+        self.upsert_users([(user_id, username, first_name)])
+
+    def upsert_users(self, users):
+        joined_at = datetime.now().isoformat()
+        with self._lock:
+            for user_id, username, first_name in users:
+                user = self._users.setdefault(user_id, {
+                    'id': user_id, 'balance': 0.0, 'withdrawn': 0.0, 'joined_at': joined_at,
+                })
+                user['username'] = username
+                user['first_name'] = first_name
+
+    def get_user_wallet(self, user_id):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user:
+                return {'balance': user['balance'], 'withdrawn': user['withdrawn']}
+            return {'balance': 0, 'withdrawn': 0}
+
+    def update_user_balance(self, user_id, amount, is_withdrawal=False):
+        with self._lock:
+            user = self._users.get(user_id)
+            if not user:
+                return
+            if is_withdrawal:
+                user['balance'] -= amount
+                user['withdrawn'] += amount
+            else:
+                user['balance'] += amount
+
+    def get_leaderboard(self, limit=10):
+        with self._lock:
+            users = sorted(self._users.values(), key=lambda user: user['balance'], reverse=True)
+            return [
+                {'first_name': u['first_name'], 'username': u['username'], 'balance': u['balance']}
+                for u in users[:limit]
+            ]
+
+    def get_all_users(self, page=0, per_page=50):
+        with self._lock:
+            users = [self._users[user_id] for user_id in sorted(self._users)]
+            offset = page * per_page
+            return [
+                {'id': u['id'], 'first_name': u['first_name'], 'username': u['username']}
+                for u in users[offset:offset + per_page]
+            ], len(users)
+
+    # --- Redeem Code Functions ---
+
+    def add_redeem_code(self, code, reward):
+        with self._lock:
+            if code in self._redeem_codes:
+                return False
+            self._redeem_codes[code] = {
+                'code': code, 'reward': float(reward), 'is_used': 0, 'used_by': None, 'used_at': None,
+            }
+            return True
+
+    def redeem_code(self, user_id, code):
+        with self._lock:
+            redeem = self._redeem_codes.get(code)
+
+            if not redeem:
+                return "invalid", "Invalid or already claimed code."
+
+            if redeem['is_used']:
+                claimer = self._users.get(redeem['used_by'])
+                claimer_name = f"User ID {redeem['used_by']}" if not claimer else claimer['first_name']
+                return "claimed", f"This code has already been claimed by {claimer_name}."
+
+            redeem.update(is_used=1, used_by=user_id, used_at=datetime.now().isoformat())
+            self.update_user_balance(user_id, redeem['reward'])
+            return "success", f"🎉 Congratulations! You've redeemed ₹{redeem['reward']}."
+
+    # --- Withdraw Functions ---
+
+    def submit_withdraw_request(self, user_id, amount, upi_id):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user:
+                user['balance'] -= amount
+
+            request_id = self._next_withdraw_id
+            self._next_withdraw_id += 1
+            self._withdrawals[request_id] = {
+                'id': request_id, 'user_id': user_id, 'amount': float(amount), 'upi_id': upi_id,
+                'status': 'pending', 'requested_at': datetime.now().isoformat(),
+            }
+            return request_id
+
+    def _pending_withdrawals(self, user_id=None):
+        return [
+            req for req in self._withdrawals.values()
+            if req['status'] == 'pending' and (user_id is None or req['user_id'] == user_id)
+        ]
+
+    def get_pending_withdrawals(self, user_id=None):
+        with self._lock:
+            if user_id:
+                return [
+                    {'id': r['id'], 'amount': r['amount'], 'upi_id': r['upi_id']}
+                    for r in self._pending_withdrawals(user_id)
+                ]
+            return [
+                {'id': r['id'], 'user_id': r['user_id'], 'amount': r['amount'], 'upi_id': r['upi_id']}
+                for r in self._pending_withdrawals()
+            ]
+
+    def get_pending_withdrawals_page(self, user_id, after_id=None, before_id=None, limit=10):
+        with self._lock:
+            requests = [
+                {'id': r['id'], 'amount': r['amount'], 'upi_id': r['upi_id']}
+                for r in self._pending_withdrawals(user_id)
+            ]
+            return _keyset_page(requests, 'id', after_id, before_id, limit)
+
+    def get_withdrawal_by_id(self, withdraw_id):
+        with self._lock:
+            request = self._withdrawals.get(withdraw_id)
+            if request and request['status'] == 'pending':
+                return dict(request)
+            return None
+
+    def update_withdrawal_status(self, withdraw_id, new_status, amount=0, user_id=0):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user and new_status == 'completed':
+                user['withdrawn'] += amount
+            elif user and new_status == 'returned':
+                user['balance'] += amount
+
+            request = self._withdrawals.get(withdraw_id)
+            if request:
+                request['status'] = new_status
+
+    # --- Admin & Settings Functions ---
+
+    def get_setting(self, key):
+        with self._lock:
+            return self._settings.get(key)
+
+    def get_settings(self):
+        with self._lock:
+            return dict(self._settings)
+
+    def set_setting(self, key, value):
+        with self._lock:
+            # Like the SQL UPDATE, unknown keys are not created
+            if key in self._settings:
+                self._settings[key] = value
+
+    # --- Link Management Functions ---
+
+    def add_link(self, title, url):
+        with self._lock:
+            if any(link['url'] == url for link in self._links.values()):
+                return
+            link_id = self._next_link_id
+            self._next_link_id += 1
+            self._links[link_id] = {'id': link_id, 'title': title, 'url': url}
+
+    def get_links(self):
+        with self._lock:
+            return [dict(link) for link in self._links.values()]
+
+    def get_links_page(self, after_id=None, before_id=None, limit=10):
+        with self._lock:
+            return _keyset_page(self.get_links(), 'id', after_id, before_id, limit)
+
+    def delete_link(self, link_id):
+        with self._lock:
+            self._links.pop(link_id, None)
+
+    # --- Verification Code Functions ---
+
+    def add_verification_code(self, code):
+        with self._lock:
+            if code in self._verification_codes:
+                return False
+            self._verification_codes[code] = None
+            return True
+
+    def get_verification_codes(self):
+        with self._lock:
+            return list(self._verification_codes)
+
+    def delete_verification_code(self, code):
+        with self._lock:
+            self._verification_codes.pop(code, None)
+
+    def verify_user_code(self, user_id, code):
+        with self._lock:
+            codes = self._verifications.setdefault(user_id, set())
+            if code in codes:
+                return "already_used"
+            codes.add(code)
+            return "success"
+
+    def has_user_verified_code(self, user_id, code):
+        with self._lock:
+            return code in self._verifications.get(user_id, ())
+
+    def has_user_verified_any_code(self, user_id):
+        with self._lock:
+            return bool(self._verifications.get(user_id))
+
+    # --- Banned User Functions ---
+
+    def ban_user(self, user_id):
+        with self._lock:
+            self._banned.setdefault(user_id, datetime.now().isoformat())
+
+    def unban_user(self, user_id):
+        with self._lock:
+            self._banned.pop(user_id, None)
+
+    def is_user_banned(self, user_id):
+        with self._lock:
+            return user_id in self._banned
+
+    def get_banned_user_ids(self):
+        with self._lock:
+            return set(self._banned)
+
+    def get_banned_users(self):
+        with self._lock:
+            return [
+                {'id': u['id'], 'username': u['username'], 'first_name': u['first_name']}
+                for u in (self._users[user_id] for user_id in sorted(self._banned) if user_id in self._users)
+            ]
+
+    def get_banned_users_page(self, after_id=None, before_id=None, limit=10):
+        with self._lock:
+            return _keyset_page(self.get_banned_users(), 'id', after_id, before_id, limit)
@@ -0,0 +1,245 @@
+"""Behaviour every storage backend must share, run against each one in storage.BACKENDS."""
+import threading
+
+import pytest
+
+from storage import BACKENDS, create_backend
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request, tmp_path):
+    options = {'database_file': str(tmp_path / 'bot_data.db')} if request.param == 'sqlite' else {}
+    backend = create_backend(request.param, **options)
+    backend.init_db()
+    return backend
+
+
+def rows(result):
+    return [dict(row) for row in result]
+
+
+def ids(result):
+    return [row['id'] for row in result]
+
+
+# --- Users ---
+
+def test_add_or_update_user_creates_and_renames(backend):
+    backend.add_or_update_user(1, 'alice', 'Alice')
+    backend.add_or_update_user(1, 'alice2', 'Alicia')
+
+    users, total = backend.get_all_users()
+    assert total == 1
+    assert rows(users) == [{'id': 1, 'first_name': 'Alicia', 'username': 'alice2'}]
+    assert backend.get_user_wallet(1) == {'balance': 0, 'withdrawn': 0}
+
+
+def test_upsert_users_batch(backend):
+    backend.add_or_update_user(1, 'a', 'A')
+    backend.update_user_balance(1, 5)
+    backend.upsert_users([(1, 'a', 'A'), (2, 'b', 'B'), (1, 'a2', 'A2')])
+
+    users, total = backend.get_all_users()
+    assert total == 2
+    assert rows(users) == [
+        {'id': 1, 'first_name': 'A2', 'username': 'a2'},
+        {'id': 2, 'first_name': 'B', 'username': 'b'},
+    ]
+    # Renaming must not reset the wallet
+    assert backend.get_user_wallet(1)['balance'] == 5
+
+
+def test_unknown_user_wallet_and_balance_updates(backend):
+    assert backend.get_user_wallet(99) == {'balance': 0, 'withdrawn': 0}
+    backend.update_user_balance(99, 10)
+    # Updating a user that doesn't exist creates nothing
+    assert backend.get_all_users()[1] == 0
+
+
+def test_balance_updates_and_leaderboard(backend):
+    for user_id in range(1, 5):
+        backend.add_or_update_user(user_id, f'u{user_id}', f'F{user_id}')
+    backend.update_user_balance(2, 30)
+    backend.update_user_balance(3, 20)
+    backend.update_user_balance(3, 5, is_withdrawal=True)
+
+    assert backend.get_user_wallet(3) == {'balance': 15, 'withdrawn': 5}
+    assert rows(backend.get_leaderboard(2)) == [
+        {'first_name': 'F2', 'username': 'u2', 'balance': 30},
+        {'first_name': 'F3', 'username': 'u3', 'balance': 15},
+    ]
+
+
+def test_get_all_users_pages(backend):
+    for user_id in range(1, 8):
+        backend.add_or_update_user(user_id, None, f'F{user_id}')
+
+    users, total = backend.get_all_users(page=1, per_page=3)
+    assert total == 7
+    assert ids(users) == [4, 5, 6]
+
+
+# --- Redeem Codes ---
+
+def test_redeem_code_flow(backend):
+    backend.add_or_update_user(1, 'a', 'Alice')
+    backend.add_or_update_user(2, 'b', 'Bob')
+
+    assert backend.add_redeem_code('CODE', 10) is True
+    assert backend.add_redeem_code('CODE', 20) is False
+
+    assert backend.redeem_code(1, 'NOPE') == ("invalid", "Invalid or already claimed code.")
+    assert backend.redeem_code(1, 'CODE') == ("success", "🎉 Congratulations! You've redeemed ₹10.0.")
+    assert backend.redeem_code(2, 'CODE') == ("claimed", "This code has already been claimed by Alice.")
+    assert backend.get_user_wallet(1)['balance'] == 10
+    assert backend.get_user_wallet(2)['balance'] == 0
+
+
+def test_redeem_code_pays_out_once_under_concurrency(backend):
+    users = range(1, 9)
+    for user_id in users:
+        backend.add_or_update_user(user_id, f'u{user_id}', f'F{user_id}')
+
+    for trial in range(20):
+        code = f'DROP{trial}'
+        backend.add_redeem_code(code, 10)
+        barrier = threading.Barrier(len(users))
+        statuses = []
+
+        def claim(user_id):
+            barrier.wait()
+            statuses.append(backend.redeem_code(user_id, code)[0])
+
+        threads = [threading.Thread(target=claim, args=(user_id,)) for user_id in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == ['claimed'] * (len(users) - 1) + ['success']
+
+    assert sum(backend.get_user_wallet(user_id)['balance'] for user_id in users) == 20 * 10
+
+
+# --- Verification Codes ---
+
+def test_verification_codes(backend):
+    assert backend.add_verification_code('v1') is True
+    assert backend.add_verification_code('v1') is False
+    backend.add_verification_code('v2')
+    backend.delete_verification_code('v2')
+    assert backend.get_verification_codes() == ['v1']
+
+    assert backend.has_user_verified_any_code(1) is False
+    assert backend.verify_user_code(1, 'v1') == "success"
+    assert backend.verify_user_code(1, 'v1') == "already_used"
+    assert backend.has_user_verified_code(1, 'v1') is True
+    assert backend.has_user_verified_code(2, 'v1') is False
+    assert backend.has_user_verified_any_code(1) is True
+
+
+# --- Withdrawals ---
+
+def test_withdraw_request_lifecycle(backend):
+    backend.add_or_update_user(1, 'a', 'A')
+    backend.update_user_balance(1, 100)
+
+    first = backend.submit_withdraw_request(1, 30, 'a@upi')
+    second = backend.submit_withdraw_request(1, 20, 'a@upi')
+    assert (first, second) == (1, 2)
+    assert backend.get_user_wallet(1) == {'balance': 50, 'withdrawn': 0}
+
+    request = dict(backend.get_withdrawal_by_id(first))
+    assert {k: request[k] for k in ('id', 'user_id', 'amount', 'upi_id', 'status')} == {
+        'id': 1, 'user_id': 1, 'amount': 30, 'upi_id': 'a@upi', 'status': 'pending',
+    }
+    assert rows(backend.get_pending_withdrawals(1)) == [
+        {'id': 1, 'amount': 30, 'upi_id': 'a@upi'},
+        {'id': 2, 'amount': 20, 'upi_id': 'a@upi'},
+    ]
+
+    backend.update_withdrawal_status(first, 'completed', 30, 1)
+    backend.update_withdrawal_status(second, 'returned', 20, 1)
+    assert backend.get_withdrawal_by_id(first) is None
+    assert rows(backend.get_pending_withdrawals()) == []
+    assert backend.get_user_wallet(1) == {'balance': 70, 'withdrawn': 30}
+
+
+def test_pending_withdrawals_pages(backend):
+    backend.add_or_update_user(1, 'a', 'A')
+    backend.add_or_update_user(2, 'b', 'B')
+    for i in range(7):
+        backend.submit_withdraw_request(1, 1, f'upi{i}')
+    backend.submit_withdraw_request(2, 1, 'other')
+    backend.update_withdrawal_status(3, 'completed', 1, 1)
+
+    assert ids(backend.get_pending_withdrawals_page(1, limit=3)) == [1, 2, 4]
+    assert ids(backend.get_pending_withdrawals_page(1, after_id=4, limit=3)) == [5, 6, 7]
+    assert ids(backend.get_pending_withdrawals_page(1, before_id=5, limit=2)) == [2, 4]
+    assert len(rows(backend.get_pending_withdrawals())) == 7
+
+
+# --- Links ---
+
+def test_links_and_pages(backend):
+    for i in range(1, 6):
+        backend.add_link(f'title{i}', f'https://example.com/{i}')
+    # Duplicate URLs are ignored
+    backend.add_link('dup', 'https://example.com/1')
+    backend.delete_link(2)
+    # IDs are never reused after a delete
+    backend.add_link('title6', 'https://example.com/6')
+
+    assert ids(backend.get_links()) == [1, 3, 4, 5, 6]
+    assert rows(backend.get_links())[0] == {'id': 1, 'title': 'title1', 'url': 'https://example.com/1'}
+    assert ids(backend.get_links_page(limit=2)) == [1, 3]
+    assert ids(backend.get_links_page(after_id=3, limit=2)) == [4, 5]
+    assert ids(backend.get_links_page(before_id=5, limit=2)) == [3, 4]
+    assert ids(backend.get_links_page(after_id=6)) == []
+
+
+# --- Bans ---
+
+def test_bans_and_pages(backend):
+    for user_id in range(1, 6):
+        backend.add_or_update_user(user_id, f'u{user_id}', f'F{user_id}')
+    for user_id in (4, 1, 3, 5, 42):
+        backend.ban_user(user_id)
+    backend.ban_user(1)
+    backend.unban_user(5)
+
+    assert backend.is_user_banned(1) is True
+    assert backend.is_user_banned(5) is False
+    assert backend.get_banned_user_ids() == {1, 3, 4, 42}
+    # Only known users are listed
+    assert rows(backend.get_banned_users()) == [
+        {'id': 1, 'username': 'u1', 'first_name': 'F1'},
+        {'id': 3, 'username': 'u3', 'first_name': 'F3'},
+        {'id': 4, 'username': 'u4', 'first_name': 'F4'},
+    ]
+    assert ids(backend.get_banned_users_page(limit=2)) == [1, 3]
+    assert ids(backend.get_banned_users_page(after_id=1, limit=2)) == [3, 4]
+    assert ids(backend.get_banned_users_page(before_id=4, limit=1)) == [3]
+
+
+# --- Settings ---
+
+def test_settings(backend):
+    assert backend.get_settings() == {
+        'min_withdraw': '100',
+        'contact_info': 'Contact info not set.',
+        'tutorial_link': 'Tutorial link not set.',
+    }
+    backend.set_setting('min_withdraw', '50')
+    assert backend.get_setting('min_withdraw') == '50'
+
+    # Unknown keys are not created
+    backend.set_setting('unknown', 'value')
+    assert backend.get_setting('unknown') is None
+    assert 'unknown' not in backend.get_settings()
+
+
+def test_init_db_is_idempotent(backend):
+    backend.set_setting('min_withdraw', '7')
+    backend.init_db()
+    assert backend.get_setting('min_withdraw') == '7'
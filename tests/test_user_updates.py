@@ -0,0 +1,80 @@
+"""How database.add_or_update_user coalesces /start writes into flush_user_updates batches."""
+import pytest
+
+import database as db
+from storage.memory import MemoryBackend
+
+
+class CountingBackend(MemoryBackend):
+    """Records every user write that reaches the backend."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def add_or_update_user(self, user_id, username, first_name):
+        self.calls.append(('add_or_update_user', (user_id, username, first_name)))
+        # MemoryBackend writes through upsert_users, which shouldn't count as a second call
+        super().upsert_users([(user_id, username, first_name)])
+
+    def upsert_users(self, users):
+        self.calls.append(('upsert_users', list(users)))
+        super().upsert_users(users)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    previous = db.backend
+    backend = CountingBackend()
+    backend.init_db()
+    db.set_backend(backend)
+    db._pending_user_updates.clear()
+    monkeypatch.setattr(db, 'RECENT_USERS_CACHE_SIZE', 2)
+    yield backend
+    db._pending_user_updates.clear()
+    db.set_backend(previous)
+
+
+def names(backend):
+    users, _ = backend.get_all_users()
+    return {user['id']: (user['username'], user['first_name']) for user in users}
+
+
+def test_unchanged_repeat_start_makes_no_backend_call(backend):
+    db.add_or_update_user(1, 'a', 'A')
+    db.add_or_update_user(1, 'a', 'A')
+
+    assert backend.calls == [('add_or_update_user', (1, 'a', 'A'))]
+    assert db.flush_user_updates() == 0
+    assert len(backend.calls) == 1
+
+
+def test_rename_is_queued_and_flushed_as_one_batch(backend):
+    db.add_or_update_user(1, 'a', 'A')
+    db.add_or_update_user(2, 'b', 'B')
+    backend.calls.clear()
+
+    db.add_or_update_user(1, 'a2', 'A2')
+    db.add_or_update_user(2, 'b2', 'B2')
+    db.add_or_update_user(1, 'a3', 'A3')
+    assert backend.calls == []
+    assert names(backend)[1] == ('a', 'A')
+
+    assert db.flush_user_updates() == 2
+    assert backend.calls == [('upsert_users', [(1, 'a3', 'A3'), (2, 'b2', 'B2')])]
+    assert names(backend) == {1: ('a3', 'A3'), 2: ('b2', 'B2')}
+
+
+def test_evicted_user_is_written_directly_and_drops_queued_rename(backend):
+    db.add_or_update_user(1, 'a', 'A')
+    db.add_or_update_user(1, 'stale', 'Stale')
+    # Seeing two more users pushes user 1 out of the recent-users cache
+    db.add_or_update_user(2, 'b', 'B')
+    db.add_or_update_user(3, 'c', 'C')
+    backend.calls.clear()
+
+    db.add_or_update_user(1, 'new', 'New')
+    assert backend.calls == [('add_or_update_user', (1, 'new', 'New'))]
+
+    assert db.flush_user_updates() == 0
+    assert names(backend)[1] == ('new', 'New')